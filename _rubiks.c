@@ -0,0 +1,321 @@
+/*
+ * Bidirectional breadth-first search for rubiks.py, written in C.
+ *
+ * Configurations are packed three bits per square into a pair of
+ * 64-bit words: squares 0-20 in lo and squares 21-23 in hi.  Each side
+ * of the search keeps an open-addressed hash table with power-of-two
+ * capacity and linear probing, mapping a configuration to the move
+ * it was reached by and its depth.  Parents are not stored; undoing
+ * the move recovers them.  An entry takes 24 bytes, and tables grow
+ * at half full, so each stored configuration costs at most 48 bytes.
+ *
+ * Build with
+ *
+ *   cc -O2 -shared -fPIC $(python3-config --includes) _rubiks.c \
+ *       -o _rubiks$(python3-config --extension-suffix)
+ */
+
+#define PY_SSIZE_T_CLEAN
+#include <Python.h>
+#include <stdint.h>
+#include <stdlib.h>
+
+#define SQUARES 24
+#define MAX_MOVES 32
+
+typedef struct {
+    uint64_t lo, hi;
+} Key;
+
+typedef struct {
+    Key key;
+    int8_t move; /* -1 for the configuration a side started from */
+    uint8_t depth;
+    uint8_t used;
+} Entry;
+
+typedef struct {
+    Entry *slots;
+    size_t cap, n;
+} Table;
+
+typedef struct {
+    Key *keys;
+    size_t n, cap;
+} Frontier;
+
+static Key pack(const uint8_t *squares)
+{
+    Key k = {0, 0};
+    for (int i = 0; i < 21; i++)
+        k.lo |= (uint64_t)squares[i] << (3 * i);
+    for (int i = 21; i < SQUARES; i++)
+        k.hi |= (uint64_t)squares[i] << (3 * (i - 21));
+    return k;
+}
+
+static void unpack(Key k, uint8_t *squares)
+{
+    for (int i = 0; i < 21; i++)
+        squares[i] = (k.lo >> (3 * i)) & 7;
+    for (int i = 21; i < SQUARES; i++)
+        squares[i] = (k.hi >> (3 * (i - 21))) & 7;
+}
+
+static Key apply(Key k, const uint8_t *perm)
+{
+    uint8_t squares[SQUARES], moved[SQUARES];
+    unpack(k, squares);
+    for (int i = 0; i < SQUARES; i++)
+        moved[i] = squares[perm[i]];
+    return pack(moved);
+}
+
+static int same(Key a, Key b)
+{
+    return a.lo == b.lo && a.hi == b.hi;
+}
+
+static size_t hash_key(Key k)
+{
+    uint64_t h = (k.lo ^ (k.hi << 63) ^ (k.hi >> 1)) * 0x9E3779B97F4A7C15ULL;
+    h ^= h >> 29;
+    h *= 0xBF58476D1CE4E5B9ULL;
+    return (size_t)(h ^ (h >> 32));
+}
+
+static int table_init(Table *t)
+{
+    t->cap = 1024;
+    t->n = 0;
+    t->slots = calloc(t->cap, sizeof(Entry));
+    return t->slots != NULL;
+}
+
+/* Slot holding k, or the empty slot where it belongs */
+static Entry *table_find(const Table *t, Key k)
+{
+    size_t mask = t->cap - 1;
+    size_t i = hash_key(k) & mask;
+    while (t->slots[i].used && !same(t->slots[i].key, k))
+        i = (i + 1) & mask;
+    return &t->slots[i];
+}
+
+static int table_grow(Table *t)
+{
+    Table bigger = {calloc(2 * t->cap, sizeof(Entry)), 2 * t->cap, t->n};
+    if (bigger.slots == NULL)
+        return 0;
+    for (size_t i = 0; i < t->cap; i++)
+        if (t->slots[i].used)
+            *table_find(&bigger, t->slots[i].key) = t->slots[i];
+    free(t->slots);
+    *t = bigger;
+    return 1;
+}
+
+/* Record k if it is new.  Returns 1 if added, 0 if already present and
+ * -1 if out of memory. */
+static int table_add(Table *t, Key k, int move, int depth)
+{
+    if (2 * (t->n + 1) > t->cap && !table_grow(t))
+        return -1;
+    Entry *e = table_find(t, k);
+    if (e->used)
+        return 0;
+    e->key = k;
+    e->move = (int8_t)move;
+    e->depth = (uint8_t)depth;
+    e->used = 1;
+    t->n++;
+    return 1;
+}
+
+static int frontier_push(Frontier *f, Key k)
+{
+    if (f->n == f->cap) {
+        size_t cap = f->cap ? 2 * f->cap : 64;
+        Key *keys = realloc(f->keys, cap * sizeof(Key));
+        if (keys == NULL)
+            return 0;
+        f->keys = keys;
+        f->cap = cap;
+    }
+    f->keys[f->n++] = k;
+    return 1;
+}
+
+/* Replace frontier with the unseen children of its configurations,
+ * recording them in table.  Returns 0 if out of memory. */
+static int grow_level(Table *table, Frontier *frontier, const uint8_t *perms,
+                      int n_moves)
+{
+    Frontier next = {NULL, 0, 0};
+    for (size_t n = 0; n < frontier->n; n++) {
+        Key k = frontier->keys[n];
+        const Entry *e = table_find(table, k);
+        int undo = e->move < 0 ? -1 : n_moves - e->move - 1;
+        int depth = e->depth + 1;
+        for (int t = 0; t < n_moves; t++) {
+            /* Undoing the move that reached k only leads back */
+            if (t == undo)
+                continue;
+            Key child = apply(k, perms + t * SQUARES);
+            int added = table_add(table, child, t, depth);
+            if (added < 0 || (added && !frontier_push(&next, child))) {
+                free(next.keys);
+                return 0;
+            }
+        }
+    }
+    free(frontier->keys);
+    *frontier = next;
+    return 1;
+}
+
+/* Configuration in frontier, also seen in other, with the fewest total
+ * moves.  Returns 0 if there is none. */
+static int best_meeting(const Table *table, const Frontier *frontier,
+                        const Table *other, Key *meet)
+{
+    int best = -1;
+    for (size_t n = 0; n < frontier->n; n++) {
+        const Entry *there = table_find(other, frontier->keys[n]);
+        if (!there->used)
+            continue;
+        int total = table_find(table, frontier->keys[n])->depth + there->depth;
+        if (best < 0 || total < best) {
+            best = total;
+            *meet = frontier->keys[n];
+        }
+    }
+    return best >= 0;
+}
+
+/* Configuration that e's move was applied to */
+static Key parent(const Entry *e, const uint8_t *perms, int n_moves)
+{
+    return apply(e->key, perms + (n_moves - e->move - 1) * SQUARES);
+}
+
+/* Moves from the start through meet to the goal, as a Python list */
+static PyObject *path(const Table *src, const Table *dst, Key meet,
+                      const uint8_t *perms, int n_moves)
+{
+    const Entry *e = table_find(src, meet);
+    Py_ssize_t n_src = e->depth, n = n_src + table_find(dst, meet)->depth;
+    PyObject *moves = PyList_New(n);
+    if (moves == NULL)
+        return NULL;
+    for (Py_ssize_t i = n_src - 1; i >= 0; i--) {
+        PyObject *move = PyLong_FromLong(e->move);
+        if (move == NULL) {
+            Py_DECREF(moves);
+            return NULL;
+        }
+        PyList_SET_ITEM(moves, i, move);
+        e = table_find(src, parent(e, perms, n_moves));
+    }
+    e = table_find(dst, meet);
+    for (Py_ssize_t i = n_src; i < n; i++) {
+        PyObject *move = PyLong_FromLong(n_moves - e->move - 1);
+        if (move == NULL) {
+            Py_DECREF(moves);
+            return NULL;
+        }
+        PyList_SET_ITEM(moves, i, move);
+        e = table_find(dst, parent(e, perms, n_moves));
+    }
+    return moves;
+}
+
+static PyObject *solve_2way(PyObject *self, PyObject *args)
+{
+    const uint8_t *start, *goal, *perms;
+    Py_ssize_t start_len, goal_len, perms_len;
+    if (!PyArg_ParseTuple(args, "y#y#y#", &start, &start_len, &goal,
+                          &goal_len, &perms, &perms_len))
+        return NULL;
+    if (start_len != SQUARES || goal_len != SQUARES) {
+        PyErr_SetString(PyExc_ValueError, "configurations must be 24 bytes");
+        return NULL;
+    }
+    if (perms_len == 0 || perms_len % SQUARES ||
+        perms_len / SQUARES > MAX_MOVES) {
+        PyErr_SetString(PyExc_ValueError,
+                        "perms must hold between 1 and 32 rows of 24 bytes");
+        return NULL;
+    }
+    for (int i = 0; i < SQUARES; i++) {
+        if (start[i] > 7 || goal[i] > 7) {
+            PyErr_SetString(PyExc_ValueError, "colors must be below 8");
+            return NULL;
+        }
+    }
+    for (Py_ssize_t i = 0; i < perms_len; i++) {
+        if (perms[i] >= SQUARES) {
+            PyErr_SetString(PyExc_ValueError, "perms must index squares");
+            return NULL;
+        }
+    }
+    int n_moves = (int)(perms_len / SQUARES);
+
+    Key src_key = pack(start), dst_key = pack(goal);
+    Table src, dst;
+    Frontier src_frontier = {NULL, 0, 0}, dst_frontier = {NULL, 0, 0};
+    PyObject *result = NULL;
+    int ok = table_init(&src);
+    ok = table_init(&dst) && ok;
+    ok = ok && table_add(&src, src_key, -1, 0) > 0 &&
+         table_add(&dst, dst_key, -1, 0) > 0 &&
+         frontier_push(&src_frontier, src_key) &&
+         frontier_push(&dst_frontier, dst_key);
+
+    Key meet = src_key;
+    int found = ok && same(src_key, dst_key);
+    Py_BEGIN_ALLOW_THREADS
+    while (ok && !found && src_frontier.n && dst_frontier.n) {
+        if (src_frontier.n <= dst_frontier.n) {
+            ok = grow_level(&src, &src_frontier, perms, n_moves);
+            found = ok && best_meeting(&src, &src_frontier, &dst, &meet);
+        } else {
+            ok = grow_level(&dst, &dst_frontier, perms, n_moves);
+            found = ok && best_meeting(&dst, &dst_frontier, &src, &meet);
+        }
+    }
+    Py_END_ALLOW_THREADS
+
+    if (!ok)
+        PyErr_NoMemory();
+    else if (found)
+        result = path(&src, &dst, meet, perms, n_moves);
+    else {
+        Py_INCREF(Py_None);
+        result = Py_None;
+    }
+
+    free(src.slots);
+    free(dst.slots);
+    free(src_frontier.keys);
+    free(dst_frontier.keys);
+    return result;
+}
+
+static PyMethodDef methods[] = {
+    {"solve_2way", solve_2way, METH_VARARGS,
+     "solve_2way(start, goal, perms)\n\n"
+     "Shortest list of moves from start to goal, both 24 bytes of square\n"
+     "colors, or None if goal cannot be reached.  perms holds one row of\n"
+     "24 square indices per move, with the inverse of move t at row\n"
+     "len(perms) // 24 - t - 1."},
+    {NULL, NULL, 0, NULL}};
+
+static struct PyModuleDef module = {
+    PyModuleDef_HEAD_INIT, "_rubiks",
+    "Bidirectional breadth-first search for rubiks.py", -1, methods};
+
+PyMODINIT_FUNC PyInit__rubiks(void)
+{
+    return PyModule_Create(&module);
+}
@@ -3,49 +3,95 @@
 2x2 Rubiks cube model and solver
 """
 
-import queue
+import collections
+import functools
+import heapq
+import math
+import operator
 import numpy as np
 import sys
 
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+
+# Optional C implementation of solve_2way, see _rubiks.c
+try:
+    import _rubiks
+except ImportError:
+    _rubiks = None
+
 
 def permutation_matrix(N, srcs, dsts):
     """Make an NxN permutation matrix that when multiplied by an Nx1
     column vector takes entries at indices srcs to dsts.
     """
-    M = np.identity(N, dtype='int64')
+    M = np.identity(N, dtype=np.int8)
     M[srcs, srcs] = 0
     M[dsts, srcs] = 1
     return M
 
 
-def create_matrices():
-    identity = permutation_matrix(24, [], [])
-
-    # Clockwise rotations
-    front = permutation_matrix(24, [0, 1, 2, 3, 19, 18, 4, 7, 21, 20, 14, 13],
-                               [1, 2, 3, 0, 4, 7, 21, 20, 14, 13, 19, 18])
-    right = permutation_matrix(24, [4, 5, 6, 7, 18, 17, 8, 11, 22, 21, 2, 1],
-                               [5, 6, 7, 4, 8, 11, 22, 21, 2, 1, 18, 17])
-    top = permutation_matrix(24, [16, 17, 18, 19, 4, 5, 8, 9, 12, 13, 0, 1],
-                             [17, 18, 19, 16, 0, 1, 4, 5, 8, 9, 12, 13])
+# Squares gathered by each clockwise rotation: after the move, square i
+# holds the color that was on square perm[i].
+_clockwise = np.array([
+    # front
+    [3, 0, 1, 2, 19, 5, 6, 18, 8, 9, 10, 11, 12, 20, 21, 15, 16, 17, 13, 14,
+     7, 4, 22, 23],
+    # right
+    [0, 21, 22, 3, 7, 4, 5, 6, 18, 9, 10, 17, 12, 13, 14, 15, 16, 1, 2, 19,
+     20, 11, 8, 23],
+    # top
+    [4, 5, 2, 3, 8, 9, 6, 7, 12, 13, 10, 11, 0, 1, 14, 15, 19, 16, 17, 18,
+     20, 21, 22, 23],
+])
+
+# All moves, followed by their inverses in reverse order, so the inverse
+# of move t is move len(perm_table) - t - 1
+perm_table = np.concatenate([_clockwise,
+                             np.argsort(_clockwise, axis=1)[::-1]
+                             ]).astype(np.uint8)
+transform_names = [
+    'front', 'right', 'top', 'top inverse', 'right inverse', 'front inverse'
+]
+# Byte shuffles applying those permutations to a packed configuration
+shuffles = [operator.itemgetter(*p) for p in perm_table.tolist()]
+# The same moves as permutation matrices, for reference
+transformations = [
+    permutation_matrix(24, p, np.arange(24)) for p in perm_table
+]
+
+
+def _expand_numpy(squares, perm_table):
+    """Apply every permutation in perm_table to each row of squares, an
+    (n, 24) uint8 array.  Returns an (n, len(perm_table), 24) array.
+    """
+    return squares[:, perm_table]
 
-    transformations = [front, right, top, top.T, right.T, front.T]
-    #transformations = [identity, front, right, top, top.T, right.T, front.T]
 
-    names = [
-        'front', 'right', 'top', 'top inverse', 'right inverse',
-        'front inverse'
-    ]
+def _expand_loops(squares, perm_table):
+    "Same as _expand_numpy, written as loops for numba to compile."
+    n, m, k = squares.shape[0], perm_table.shape[0], perm_table.shape[1]
+    out = np.empty((n, m, k), dtype=np.uint8)
+    for i in range(n):
+        for t in range(m):
+            for j in range(k):
+                out[i, t, j] = squares[i, perm_table[t, j]]
+    return out
 
-    return transformations, names
 
+# numba is optional; fall back to a NumPy gather without it
+_expand = njit(cache=True)(_expand_loops) if njit else _expand_numpy
 
-transformations, transform_names = create_matrices()
-projection = 100000 * np.random.randn(1, 24)
+# Freelist of discarded Rubiks2x2 objects for reuse by transform
+_pool = []
 
 
 class Rubiks2x2:
-    def __init__(self, faces=None, parent=None, parent_move=None):
+    __slots__ = ('faces', '_hash')
+
+    def __init__(self, faces=None):
         """Immutable representation of a 2x2 rubiks cube configuration
 
         Each face has 2x2 array of squares, so there are 24 squares
@@ -68,47 +114,74 @@ class Rubiks2x2:
         (20,21)
         (23,22)
 
-        Also includes parent configuration and move to get there for
-        backtracking purposes.  These are not considered in hashing
-        and equality testing, though.
+        The squares are packed into a single int with square i stored
+        in bits [8i, 8i+8), so hashing and equality are plain integer
+        operations.
+
+        How a configuration was reached is not stored on it.  The
+        solvers record it in a dict mapping each packed configuration to
+        its (parent, move), so configurations can be freed once they have
+        been searched.
 
         """
         if faces is None:
             #                 front    right    back     left     top      bottom
             #                 0 1 2 3  4 5 6 7  8 91011 12131415 16171819 20212223
-            faces = np.array([
+            faces = int.from_bytes(bytes([
                 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2, 3, 3, 3, 3, 4, 4, 4, 4, 5,
                 5, 5, 5
-            ])
-            faces = faces[:, None]
+            ]), 'little')
         self.faces = faces
-        self.parent = parent
-        self.parent_move = parent_move
+        self._hash = None
+
+    @classmethod
+    def _acquire(cls, faces):
+        """Fast constructor for derived configurations, skips __init__
+        and reuses a released object when one is available.
+        """
+        obj = _pool.pop() if _pool else cls.__new__(cls)
+        obj.faces = faces
+        obj._hash = None
+        return obj
+
+    def _release(self):
+        """Return a configuration that is no longer referenced anywhere
+        to the freelist.
+        """
+        _pool.append(self)
+
+    def squares(self):
+        "Colors of the 24 squares as a bytes object"
+        return self.faces.to_bytes(24, 'little')
 
     def transform(self, num):
-        return Rubiks2x2(transformations[num] @ self.faces, self, num)
+        faces = bytes(shuffles[num](self.squares()))
+        return Rubiks2x2._acquire(int.from_bytes(faces, 'little'))
 
     def dist(self, other):
-        return (self.faces != other.faces).sum()
+        return sum(a != b for a, b in zip(self.squares(), other.squares()))
 
     def __repr__(self):
-        strings = [str(n[0]) for n in self.faces]
-        return ("(" + strings[16] + "," + strings[17] + ")\n" + "(" +
-                strings[19] + "," + strings[18] + ")\n" + "  |\n" + "(" +
-                strings[0] + "," + strings[1] + ") _ " + "(" + strings[4] + ","
-                + strings[5] + ") _ " + "(" + strings[8] + "," + strings[9] +
-                ") _ " + "(" + strings[12] + "," + strings[13] + ")\n" + "(" +
-                strings[3] + "," + strings[2] + ")   " + "(" + strings[7] +
-                "," + strings[6] + ")   " + "(" + strings[11] + "," +
-                strings[10] + ")   " + "(" + strings[15] + "," + strings[14] +
-                ")\n" + "  |\n" + "(" + strings[20] + "," + strings[21] +
-                ")\n" + "(" + strings[23] + "," + strings[22] + ")\n")
+        s = self.squares()
+        return (f"({s[16]},{s[17]})\n"
+                f"({s[19]},{s[18]})\n"
+                f"  |\n"
+                f"({s[0]},{s[1]}) _ ({s[4]},{s[5]}) _ "
+                f"({s[8]},{s[9]}) _ ({s[12]},{s[13]})\n"
+                f"({s[3]},{s[2]})   ({s[7]},{s[6]})   "
+                f"({s[11]},{s[10]})   ({s[15]},{s[14]})\n"
+                f"  |\n"
+                f"({s[20]},{s[21]})\n"
+                f"({s[23]},{s[22]})\n")
 
     def __hash__(self):
-        return int(projection @ self.faces)
+        h = self._hash
+        if h is None:
+            h = self._hash = hash(self.faces)
+        return h
 
     def __eq__(self, other):
-        return np.all(self.faces == other.faces)
+        return self.faces == other.faces
 
 
 def randomize(cube, n_steps):
@@ -116,15 +189,250 @@ def randomize(cube, n_steps):
     """
     visited = set([cube])
     while n_steps > 0:
-        t = np.random.randint(len(transformations))
+        t = np.random.randint(len(perm_table))
         new_cube = cube.transform(t)
         if new_cube not in visited:
             cube = new_cube
             n_steps -= 1
             visited.add(cube)
+        else:
+            new_cube._release()
     return cube
 
 
+# Squares of the seven corners that move, each listed top or bottom
+# square first and then clockwise around the corner.  The
+# back-left-bottom corner is never moved by any of the moves.
+corners = np.array([(19, 0, 13), (18, 4, 1), (17, 8, 5), (16, 12, 9),
+                    (20, 14, 3), (21, 2, 7), (22, 6, 11)])
+fixed_corner = np.array([23, 10, 15])
+_factorials = np.array([720, 120, 24, 6, 2, 1, 1])
+_powers_of_3 = 3**np.arange(len(corners))
+
+
+@functools.lru_cache(maxsize=None)
+def _solved_squares():
+    "Colors of the solved cube's squares as a uint8 array"
+    return np.frombuffer(Rubiks2x2().squares(), dtype=np.uint8)
+
+
+@functools.lru_cache(maxsize=None)
+def _solved_corners():
+    "Colors of each corner of the solved cube, in the order of corners"
+    return _solved_squares()[corners]
+
+
+@functools.lru_cache(maxsize=None)
+def _corner_lookup():
+    """Map each corner's color bitmask in the solved cube to a corner id,
+    and 255 for color sets no corner has.
+    """
+    squares = _solved_squares()
+    lookup = np.full(64, 255, dtype=np.uint8)
+    for n, corner in enumerate(corners):
+        lookup[np.bitwise_or.reduce(1 << squares[corner])] = n
+    return lookup
+
+
+def corner_index(squares, check=True):
+    """Index of each row of squares, an (n, 24) uint8 array, from the
+    positions and twists of its corners.  Indices are below
+    5040 * 3**7.
+
+    With check, raises ValueError if a row does not hold each corner
+    exactly once with its colors in their solved rotational order, as
+    such a configuration cannot be reached by any moves.
+    """
+    colors = squares[:, corners]
+    ids = _corner_lookup()[np.bitwise_or.reduce(1 << colors, axis=2)]
+    twists = np.argmax(colors >= 4, axis=2)
+    if check and not _valid_corners(squares, colors, ids, twists).all():
+        raise ValueError("configuration cannot be solved")
+    rank = np.zeros(len(squares), dtype=np.int64)
+    for i in range(len(corners) - 1):
+        smaller = (ids[:, i + 1:] < ids[:, i:i + 1]).sum(axis=1)
+        rank += smaller * _factorials[i]
+    return rank * 3**len(corners) + twists @ _powers_of_3
+
+
+def _valid_corners(squares, colors, ids, twists):
+    """Whether each row holds every corner once, with its colors in their
+    solved rotational order, and the fixed corner in place.
+    """
+    solved = _solved_squares()
+    # Rotate each corner's colors so its top or bottom color comes first
+    turned = np.take_along_axis(colors,
+                                (twists[:, :, None] + np.arange(3)) % 3,
+                                axis=2)
+    expected = _solved_corners()[np.minimum(ids, len(corners) - 1)]
+    return ((np.sort(ids, axis=1) == np.arange(len(corners))).all(axis=1)
+            & (turned == expected).all(axis=(1, 2))
+            & (squares[:, fixed_corner] == solved[fixed_corner]).all(axis=1))
+
+
+@functools.lru_cache(maxsize=None)
+def pattern_database(chunk=1 << 16):
+    """Number of moves from every reachable configuration to the solved
+    cube, indexed by corner_index.  Unreachable indices hold 255.
+
+    Built once by a breadth-first search backwards from the solved cube
+    over all 3,674,160 reachable configurations, which takes several
+    seconds.
+    """
+    dist = np.full(5040 * 3**len(corners), 255, dtype=np.uint8)
+    frontier = np.frombuffer(Rubiks2x2().squares(), dtype=np.uint8)[None, :]
+    dist[corner_index(frontier)] = 0
+    depth = 0
+    while len(frontier):
+        depth += 1
+        found = []
+        for i in range(0, len(frontier), chunk):
+            new = _expand(frontier[i:i + chunk], perm_table).reshape(-1, 24)
+            # Everything reached from the solved cube is valid
+            index = corner_index(new, check=False)
+            unseen = dist[index] == 255
+            index, first = np.unique(index[unseen], return_index=True)
+            dist[index] = depth
+            found.append(new[unseen][first])
+        frontier = np.concatenate(found)
+    return dist
+
+
+def pdb_distance(cube, check=True):
+    """Number of moves from cube to the solved cube.  Raises ValueError
+    if cube cannot be solved.
+
+    Moves keep a solvable configuration solvable, so searches check their
+    starting configuration once and pass check=False for the rest.
+    """
+    squares = np.frombuffer(cube.squares(), dtype=np.uint8)[None, :]
+    dist = int(pattern_database()[corner_index(squares, check)[0]])
+    if dist == 255:
+        raise ValueError("configuration cannot be solved")
+    return dist
+
+
+def solve_pdb(cube):
+    """Solve by repeatedly taking the move that brings cube closest to
+    the solved cube according to the pattern database.  Each step lowers
+    the distance by one, so the path is a shortest one.
+    """
+    goal = Rubiks2x2()
+    remaining = pdb_distance(cube)
+    latest = Rubiks2x2(cube.faces)
+    parents = {latest.faces: None}
+    N = len(perm_table)
+    while remaining > 0:
+        options = [latest.transform(t) for t in range(N)]
+        t = min(range(N),
+                key=lambda t: pdb_distance(options[t], check=False))
+        parents[options[t].faces] = (latest.faces, t)
+        latest = options[t]
+        remaining -= 1
+    if latest != goal:
+        raise ValueError("pattern database did not lead to the solved cube")
+    print("Found it!")
+    print_history(latest, parents)
+    return latest
+
+
+def ida_star(start, goal, h, limit=14):
+    """Iterative-deepening A*: repeated depth-first searches from start
+    that give up on a path once the moves made plus h, a lower bound on
+    the moves still needed, exceed a bound.  The bound is raised to the
+    smallest value that was exceeded until goal is reached.  Memory use
+    is proportional to the solution length.
+
+    Every reachable configuration is at most 14 quarter turns from any
+    other, so the search stops once the bound would exceed limit.
+
+    Returns the list of moves from start to goal, or None if goal is
+    more than limit moves away, which with the default limit means it
+    cannot be reached.  With a weak h, proving that can take a long
+    time.
+    """
+    bound = h(start)
+    path = [start]
+    moves = []
+    while bound <= limit:
+        bound = _dfs(path, moves, bound, h, goal)
+        if bound is None:
+            return moves
+    return None
+
+
+def _dfs(path, moves, bound, h, goal):
+    """Extend path, and the moves between its configurations,
+    depth-first within bound.  Returns None if goal was reached, leaving
+    it at the end of path, otherwise the smallest estimate that exceeded
+    bound.
+    """
+    latest = path[-1]
+    depth = len(moves)
+    estimate = depth + h(latest)
+    if estimate > bound:
+        return estimate
+    if latest == goal:
+        return None
+
+    N = len(perm_table)
+    lowest = math.inf
+    for t in range(N):
+        # Undoing the previous move never shortens a path, and neither
+        # does a third quarter turn of the same face, which equals a
+        # single turn the other way
+        if depth > 0 and t == N - moves[-1] - 1:
+            continue
+        if depth > 1 and t == moves[-1] == moves[-2]:
+            continue
+        new_cube = latest.transform(t)
+        path.append(new_cube)
+        moves.append(t)
+        result = _dfs(path, moves, bound, h, goal)
+        if result is None:
+            return None
+        path.pop()
+        moves.pop()
+        new_cube._release()
+        lowest = min(lowest, result)
+    return lowest
+
+
+def solve_ida(cube, goal=None):
+    """Iterative-deepening A* from start state to goal state, bounded by
+    the pattern database when the goal is the solved cube.
+    """
+    if goal is None:
+        goal = Rubiks2x2()
+
+    if goal == Rubiks2x2():
+        pdb_distance(cube)
+        bound = functools.partial(pdb_distance, check=False)
+    else:
+        bound = lambda c: -(-c.dist(goal) // 12)
+
+    moves = ida_star(Rubiks2x2(cube.faces), goal, bound)
+    if moves is not None:
+        print("Found it!")
+        found, parents = _replay(cube, moves)
+        print_history(found, parents)
+        return found
+
+
+def _replay(cube, moves):
+    """Apply moves to cube.  Returns the final configuration and a dict
+    of how each configuration along the way was reached, for
+    print_history.
+    """
+    latest = Rubiks2x2(cube.faces)
+    parents = {latest.faces: None}
+    for t in moves:
+        new_cube = latest.transform(t)
+        parents[new_cube.faces] = (latest.faces, t)
+        latest = new_cube
+    return latest, parents
+
+
 def solve(cube, goal=None):
     """Breadth-first search from start state to goal state.
     """
@@ -132,115 +440,220 @@ def solve(cube, goal=None):
         goal = Rubiks2x2()
 
     s = Status()
-    q = queue.Queue()
+    q = collections.deque()
     start = Rubiks2x2(cube.faces)
-    q.put(start)
-
-    while not q.empty():
+    q.append(start)
+    parents = {start.faces: None}
+    if start == goal:
+        print("Found it!")
+        print_history(start, parents)
+        return start
+
+    while q:
         s.tick()
-        latest = q.get()
-        for t in range(len(transformations)):
+        latest = q.popleft()
+        N = len(perm_table)
+        link = parents[latest.faces]
+        for t in range(N):
+            # Undoing the previous move never leads anywhere new
+            if link is not None and t == N - link[1] - 1:
+                continue
             new_cube = latest.transform(t)
+            if new_cube.faces in parents:
+                new_cube._release()
+                continue
+            parents[new_cube.faces] = (latest.faces, t)
             if new_cube == goal:
                 print("Found it!")
-                print_history(new_cube)
+                print_history(new_cube, parents)
                 return new_cube
-            q.put(new_cube)
+            q.append(new_cube)
 
 
 def solve_2way(cube, goal=None):
     """Breadth-first search from both start state and goal state
     simultaneously.  Works best.
 
+    Searches over packed configurations one whole level at a time,
+    always growing the smaller frontier, and records how each
+    configuration was reached in a dict per side.  The search stops at
+    the first level that reaches a configuration already seen from the
+    other side.  The goal side's half of the path is then copied into
+    the start side's dict for print_history.
+
+    Uses the same search written in C from the _rubiks extension when it
+    has been built.
+
     """
     if goal is None:
         goal = Rubiks2x2()
 
-    s = Status()
+    if _rubiks is not None:
+        moves = _rubiks.solve_2way(cube.squares(), goal.squares(),
+                                   perm_table.tobytes())
+        if moves is None:
+            return None
+        print("Found it!")
+        found, parents = _replay(cube, moves)
+        print_history(found, parents)
+        return found
 
-    start = Rubiks2x2(cube.faces)
-    srcq = queue.Queue()
-    srcq.put(start)
+    s = Status()
+    N = len(perm_table)
 
-    end = Rubiks2x2(goal.faces)
-    dstq = queue.Queue()
-    dstq.put(end)
+    start = cube.faces
+    src_parents = {start: None}
+    src_frontier = [start]
 
-    goal_set = {end: end}
+    end = goal.faces
+    dst_parents = {end: None}
+    dst_frontier = [end]
 
-    while not srcq.empty():
-        N = len(transformations)
+    meet = src_parents.keys() & dst_parents.keys()
+    while not meet and src_frontier and dst_frontier:
         s.tick()
-        latest_dst = dstq.get()
+        if len(src_frontier) <= len(dst_frontier):
+            src_frontier = _grow(src_frontier, src_parents)
+            meet = dst_parents.keys() & src_frontier
+        else:
+            dst_frontier = _grow(dst_frontier, dst_parents)
+            meet = src_parents.keys() & dst_frontier
+    if not meet:
+        return None
+
+    print("Found it!")
+    middle = min(meet,
+                 key=lambda f: _depth(f, src_parents) + _depth(f, dst_parents))
+    faces = middle
+    link = dst_parents[middle]
+    while link is not None:
+        parent, t = link
+        src_parents[parent] = (faces, N - t - 1)
+        faces = parent
+        link = dst_parents[parent]
+    found = Rubiks2x2(faces)
+    print_history(found, src_parents)
+    return found
+
+
+def _grow(frontier, parents):
+    """Expand every packed configuration in frontier by one move,
+    recording unseen children in parents.  Returns the new frontier.
+
+    All children of the level are computed with a single _expand call.
+    """
+    squares = np.frombuffer(b''.join(f.to_bytes(24, 'little')
+                                     for f in frontier),
+                            dtype=np.uint8).reshape(-1, 24)
+    out = _expand(squares, perm_table).tobytes()
+    N = len(perm_table)
+    new_frontier = []
+    for n, faces in enumerate(frontier):
+        # Undoing the move that reached faces only leads back to its parent
+        link = parents[faces]
+        undo = None if link is None else N - link[1] - 1
         for t in range(N):
-            new_dst = latest_dst.transform(t)
-            goal_set[new_dst] = new_dst
-            dstq.put(new_dst)
+            if t == undo:
+                continue
+            i = (n * N + t) * 24
+            new_faces = int.from_bytes(out[i:i + 24], 'little')
+            if new_faces not in parents:
+                parents[new_faces] = (faces, t)
+                new_frontier.append(new_faces)
+    return new_frontier
 
-        latest_src = srcq.get()
-        for t in range(N):
-            new_src = latest_src.transform(t)
-            if new_src in goal_set:
-                print("Found it!")
-                remainder = goal_set[new_src]
-                while remainder.parent:
-                    new_src = new_src.transform(N - remainder.parent_move - 1)
-                    remainder = remainder.parent
-                print_history(new_src)
-                return new_src
-            srcq.put(new_src)
+
+def _depth(faces, parents):
+    "Number of moves recorded in parents to reach faces"
+    depth = 0
+    while parents[faces] is not None:
+        faces = parents[faces][0]
+        depth += 1
+    return depth
 
 
 def solve_pq(cube, goal=None):
-    """Use a priority queue to find best path where priority is the number
-    of squares two configurations have in common.  This turns out not
-    to be a good metric, so this method doesn't work very well.
+    """A* search using a priority queue where priority is the number of
+    moves made so far plus a lower bound on the number still needed.
+
+    A quarter turn moves 12 squares, so a configuration with k squares
+    differing from the goal is at least ceil(k / 12) moves away.  The
+    bound is admissible and consistent, so the first time the goal is
+    taken off the queue its path is a shortest one.  When the goal is the
+    solved cube, the exact distance from the pattern database is used
+    instead.
 
     """
     if goal is None:
         goal = Rubiks2x2()
 
+    if goal == Rubiks2x2():
+        pdb_distance(cube)
+        bound = functools.partial(pdb_distance, check=False)
+    else:
+        bound = lambda c: -(-c.dist(goal) // 12)
+
     s = Status()
-    q = queue.PriorityQueue()
+    q = []
     start = Rubiks2x2(cube.faces)
-    q.put(PriorityItem(start, goal))
-    visited = set([start])
+    heapq.heappush(q, PriorityItem(start, 0, bound(start), None))
+    parents = {}
 
-    while not q.empty():
+    while q:
         s.tick()
-        latest = q.get().item
-        for t in range(len(transformations)):
-            new_cube = latest.transform(t)
-            if new_cube == goal:
-                print("Found it!")
-                print_history(new_cube)
-                return new_cube
-            if new_cube not in visited:
-                q.put(PriorityItem(new_cube, goal))
-                visited.add(new_cube)
+        latest = heapq.heappop(q)
+        faces = latest.item.faces
+        if faces in parents:
+            continue
+        parents[faces] = latest.link
+        if latest.item == goal:
+            print("Found it!")
+            print_history(latest.item, parents)
+            return latest.item
+        N = len(perm_table)
+        for t in range(N):
+            # Undoing the previous move never leads anywhere new
+            if latest.link is not None and t == N - latest.link[1] - 1:
+                continue
+            new_cube = latest.item.transform(t)
+            if new_cube.faces not in parents:
+                heapq.heappush(
+                    q,
+                    PriorityItem(new_cube, latest.depth + 1, bound(new_cube),
+                                 (faces, t)))
+            else:
+                new_cube._release()
 
 
 class PriorityItem:
-    """Lower is better.
+    """Lower is better.  Ties go to the deeper configuration, which is
+    closer to the goal.  link is the (parent, move) that reached item, or
+    None for the starting configuration.
     """
 
-    def __init__(self, item, goal):
+    def __init__(self, item, depth, bound, link):
         self.item = item
-        self.goal = goal
-        self.priority = item.dist(goal)
+        self.depth = depth
+        self.link = link
+        self.priority = depth + bound
 
     def __lt__(self, other):
-        return self.priority < other.priority
+        return (self.priority, -self.depth) < (other.priority, -other.depth)
 
 
-def print_history(cube):
+def print_history(cube, parents):
+    """Print the moves that reached cube, following parents, a dict
+    mapping each packed configuration to its (parent, move), or to None
+    for the starting configuration.
+    """
     print(cube)
     n_steps = 0
-    while cube.parent_move is not None:
-        print(f"Came from move: '{transform_names[cube.parent_move]}' on")
-        cube = cube.parent
+    faces = cube.faces
+    while parents[faces] is not None:
+        faces, t = parents[faces]
+        print(f"Came from move: '{transform_names[t]}' on")
         n_steps += 1
-        print(cube)
+        print(Rubiks2x2(faces))
     print("Total", n_steps, "steps")
 
 